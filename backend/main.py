@@ -1,25 +1,22 @@
-from fastapi import FastAPI, HTTPException, Depends, status, Query
+from fastapi import FastAPI, HTTPException, Depends
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import JSONResponse, StreamingResponse
-from pydantic import BaseModel, Field, HttpUrl
-from typing import List, Optional, Dict, Any
+from fastapi.responses import ORJSONResponse, StreamingResponse
+from pydantic import BaseModel, Field, PrivateAttr
+from typing import List, Optional, Dict, Any, Tuple, TypedDict
 import httpx
+import asyncio
+import itertools
 import os
-import json
 import logging
+import orjson
+from dataclasses import dataclass
 from datetime import datetime, timedelta
-from enum import Enum
-from typing_extensions import Annotated
-import pandas as pd
-from pathlib import Path
+import numpy as np
 from dotenv import load_dotenv
-from cachetools import TTLCache, cached
-from urllib.parse import urlencode, quote_plus
-import io
-import csv
+from cachetools import TTLCache
 
 # Import quota management
-from quota_manager import quota_manager, check_quota_and_proceed, record_api_usage, get_quota_alerts
+from quota_manager import get_quota_manager, rate_limited_envelope, record_api_usage, get_quota_alerts
 
 # Configure logging
 logging.basicConfig(level=logging.INFO)
@@ -28,14 +25,27 @@ logger = logging.getLogger(__name__)
 # Load environment variables
 load_dotenv()
 
-# Force reload to pick up new API key
-print(f"Loaded API key: {os.getenv('YOUTUBE_API_KEY', 'NOT_FOUND')}")
+@dataclass(frozen=True)
+class Config:
+    """Settings read once from the environment at import."""
+    youtube_api_keys: Tuple[str, ...]  # Each key has its own daily quota; calls rotate across them
+    youtube_api_url: str = "https://www.googleapis.com/youtube/v3"
+
+def _api_keys_from_env() -> Tuple[str, ...]:
+    """YOUTUBE_API_KEYS (comma-separated) if set, otherwise the single YOUTUBE_API_KEY."""
+    keys = tuple(key.strip() for key in os.getenv("YOUTUBE_API_KEYS", "").split(",") if key.strip())
+    if not keys and os.getenv("YOUTUBE_API_KEY"):
+        keys = (os.getenv("YOUTUBE_API_KEY"),)
+    return keys
+
+CONFIG = Config(youtube_api_keys=_api_keys_from_env())
 
 # Initialize FastAPI
 app = FastAPI(
     title="High-Ticket Podcast Client Finder API",
     description="API for finding high-ticket podcast clients on YouTube",
-    version="1.0.0"
+    version="1.0.0",
+    default_response_class=ORJSONResponse
 )
 
 # CORS middleware
@@ -48,17 +58,51 @@ app.add_middleware(
 )
 
 # Cache setup
-search_cache = TTLCache(maxsize=100, ttl=3600)
+search_cache = TTLCache(maxsize=1024, ttl=3600)
+_inflight: Dict[Any, asyncio.Future] = {}  # Pending YouTube API fetches by cache key
+
+@app.on_event("startup")
+async def startup_http_client():
+    """Create a shared HTTP client so YouTube API connections are kept alive across requests."""
+    if not CONFIG.youtube_api_keys:
+        raise RuntimeError("YOUTUBE_API_KEY or YOUTUBE_API_KEYS is required")
+    get_quota_manager(api_keys=list(CONFIG.youtube_api_keys))
+    # Created here so it binds to the serving event loop, not whichever loop existed at import
+    app.state.yt_sem = asyncio.Semaphore(YT_MAX_CONCURRENCY)
+    app.state.http = httpx.AsyncClient(
+        timeout=30.0,
+        http2=True,  # Multiplex concurrent YouTube API calls over one connection
+        limits=httpx.Limits(max_connections=100, max_keepalive_connections=20),
+        headers={
+            "Referer": "http://localhost:8000",
+            "User-Agent": "High-Ticket Podcast Client Finder"
+        }
+    )
+
+@app.on_event("shutdown")
+async def shutdown_http_client():
+    """Close the shared HTTP client."""
+    await app.state.http.aclose()
+
+def get_http_client() -> httpx.AsyncClient:
+    """Dependency returning the shared HTTP client."""
+    return app.state.http
 
 # Constants
-YOUTUBE_API_KEY = os.getenv("YOUTUBE_API_KEY")
-YOUTUBE_API_URL = "https://www.googleapis.com/youtube/v3"
 DEFAULT_REGIONS = ["US", "GB", "CA", "AU", "DE", "NL", "SG"]
 
+# Concurrency and retry limits for YouTube API calls
+YT_MAX_CONCURRENCY = int(os.getenv("YT_MAX_CONCURRENCY", 8))
+YT_MAX_RETRIES = 3
+YT_RETRY_STATUS_CODES = {429, 500, 502, 503, 504}
+YT_CHANNELS_BATCH_SIZE = 50  # Maximum IDs per channels.list request
+YT_MAX_PACING_WAIT = 1.0  # Quota waits longer than this mean the quota is spent, not just paced
+
 # Niche weights for scoring (higher = more valuable)
-NICHE_WEIGHTS = {
+_RAW_NICHE_WEIGHTS = {
     "business podcast": 1.0,
     "entrepreneur podcast": 0.95,
+    "entrepreneurship podcast": 0.95,
     "finance podcast": 0.9,
     "real estate podcast": 0.85,
     "saas podcast": 0.8,
@@ -69,6 +113,10 @@ NICHE_WEIGHTS = {
     "leadership podcast": 0.85,
 }
 
+# Keys are lowercased once here so lookups only need to lowercase the keyword
+NICHE_WEIGHTS = {k.lower(): v for k, v in _RAW_NICHE_WEIGHTS.items()}
+_NICHE_GET = NICHE_WEIGHTS.get
+
 # Response Models
 class Channel(BaseModel):
     id: str
@@ -87,6 +135,24 @@ class Channel(BaseModel):
     contact_email: Optional[str] = None
     social_links: Optional[Dict[str, str]] = None
 
+class _ChannelRow(TypedDict):
+    """Unvalidated channel data in the Channel schema; /api/search serializes it directly, skipping Pydantic."""
+    id: str
+    title: str
+    description: str
+    thumbnail_url: str
+    subscriber_count: int
+    video_count: int
+    view_count: int
+    region: str
+    keywords_matched: List[str]
+    last_upload_date: datetime
+    days_since_last_upload: int
+    score: float
+    channel_url: str
+    contact_email: Optional[str]
+    social_links: Optional[Dict[str, str]]
+
 class SearchParams(BaseModel):
     keywords: List[str] = Field(
         ...,
@@ -124,6 +190,17 @@ class SearchParams(BaseModel):
         description="Maximum number of results to return",
         example=50
     )
+    
+    _keywords_lower: Tuple[str, ...] = PrivateAttr(default=())
+    
+    def __init__(self, **data: Any):
+        super().__init__(**data)
+        self._keywords_lower = tuple(k.lower() for k in self.keywords)
+    
+    @property
+    def keywords_lower(self) -> Tuple[str, ...]:
+        """Lowercased keywords, computed once when the params are parsed."""
+        return self._keywords_lower
 
 class OutreachRequest(BaseModel):
     channel_ids: List[str]
@@ -144,22 +221,145 @@ class SearchResponse(BaseModel):
     params: dict
     timestamp: datetime = Field(default_factory=datetime.utcnow)
 
-# Constants
-YOUTUBE_API_KEY = os.getenv("YOUTUBE_API_KEY")
-YOUTUBE_API_URL = "https://www.googleapis.com/youtube/v3"
+# Mock data, built once at import instead of on every request
+_MOCK_NOW = datetime.utcnow()
+
+_EXPORT_MOCK_CHANNELS: Tuple[Channel, ...] = (
+    Channel(
+        id="UC1234567890",
+        title="The Business Mastery Podcast",
+        description="Helping entrepreneurs scale their businesses through actionable strategies and expert interviews",
+        thumbnail_url="https://via.placeholder.com/150",
+        subscriber_count=125000,
+        video_count=245,
+        view_count=2500000,
+        region="US",
+        keywords_matched=["business podcast"],
+        last_upload_date=_MOCK_NOW - timedelta(days=5),
+        days_since_last_upload=5,
+        score=85.5,
+        channel_url="https://youtube.com/channel/UC1234567890",
+        contact_email="contact@businessmastery.com"
+    ),
+    Channel(
+        id="UC0987654321",
+        title="Real Estate Wealth Show",
+        description="Building wealth through real estate investing strategies and market insights",
+        thumbnail_url="https://via.placeholder.com/150",
+        subscriber_count=98000,
+        video_count=189,
+        view_count=1800000,
+        region="US",
+        keywords_matched=["real estate podcast"],
+        last_upload_date=_MOCK_NOW - timedelta(days=12),
+        days_since_last_upload=12,
+        score=78.2,
+        channel_url="https://youtube.com/channel/UC0987654321",
+        contact_email="info@realestatewealth.com"
+    ),
+)
 
-# Niche weights for scoring
-NICHE_WEIGHTS = {
-    "business podcast": 1.0,
-    "entrepreneurship podcast": 0.9,
-    "finance podcast": 0.8,
-    "real estate podcast": 0.85,
-    "saas podcast": 0.7,
-    "coaching podcast": 0.75,
-    "marketing podcast": 0.8
-}
+_MOCK_CHANNELS: Tuple[Channel, ...] = (
+    Channel(
+        id="UC1234567890",
+        title="The Business Mastery Podcast",
+        description="Helping entrepreneurs scale their businesses",
+        thumbnail_url="https://via.placeholder.com/150",
+        subscriber_count=125000,
+        video_count=245,
+        view_count=2500000,
+        region="US",
+        keywords_matched=["business podcast"],
+        last_upload_date=_MOCK_NOW - timedelta(days=5),
+        days_since_last_upload=5,
+        score=85.5,
+        channel_url="https://youtube.com/channel/UC1234567890"
+    ),
+    Channel(
+        id="UC0987654321",
+        title="Real Estate Wealth Show",
+        description="Building wealth through real estate investing",
+        thumbnail_url="https://via.placeholder.com/150",
+        subscriber_count=98000,
+        video_count=189,
+        view_count=1800000,
+        region="US",
+        keywords_matched=["real estate podcast"],
+        last_upload_date=_MOCK_NOW - timedelta(days=12),
+        days_since_last_upload=12,
+        score=78.2,
+        channel_url="https://youtube.com/channel/UC0987654321"
+    ),
+    Channel(
+        id="UC5432109876",
+        title="SaaS Growth Strategies",
+        description="Scaling software as a service companies",
+        thumbnail_url="https://via.placeholder.com/150",
+        subscriber_count=75000,
+        video_count=156,
+        view_count=1200000,
+        region="UK",
+        keywords_matched=["saas podcast"],
+        last_upload_date=_MOCK_NOW - timedelta(days=3),
+        days_since_last_upload=3,
+        score=82.1,
+        channel_url="https://youtube.com/channel/UC5432109876"
+    ),
+    Channel(
+        id="UC1111222333",
+        title="Finance Freedom Podcast",
+        description="Achieving financial independence through smart investing",
+        thumbnail_url="https://via.placeholder.com/150",
+        subscriber_count=156000,
+        video_count=298,
+        view_count=3200000,
+        region="CA",
+        keywords_matched=["finance podcast"],
+        last_upload_date=_MOCK_NOW - timedelta(days=7),
+        days_since_last_upload=7,
+        score=88.7,
+        channel_url="https://youtube.com/channel/UC1111222333"
+    ),
+    Channel(
+        id="UC4444555666",
+        title="Coaching Excellence Show",
+        description="Helping coaches build successful businesses",
+        thumbnail_url="https://via.placeholder.com/150",
+        subscriber_count=62000,
+        video_count=178,
+        view_count=980000,
+        region="AU",
+        keywords_matched=["coaching podcast"],
+        last_upload_date=_MOCK_NOW - timedelta(days=15),
+        days_since_last_upload=15,
+        score=74.3,
+        channel_url="https://youtube.com/channel/UC4444555666"
+    ),
+)
 
-DEFAULT_REGIONS = ["US", "UK", "CA", "AU", "DE", "NL", "SG"]
+def calculate_score_batch(
+    subs: np.ndarray,
+    days: np.ndarray,
+    niche_weights: np.ndarray,
+    min_subs: int,
+    max_subs: int
+) -> np.ndarray:
+    """Calculate 0-100 scores for many channels at once from their metrics."""
+    # Base score from niche (40% weight)
+    niche_score = niche_weights * 40
+    
+    # Subscriber score (30% weight), linear between min and max
+    sub_span = max(max_subs - min_subs, 1)
+    sub_score = np.select(
+        [subs >= max_subs, subs <= min_subs],
+        [30, 10],
+        default=10 + 20 * (subs - min_subs) / sub_span  # Between 10-30
+    )
+    
+    # Recency score (30% weight)
+    recency_score = np.select([days <= 7, days <= 30, days <= 90], [30, 25, 15], default=5)
+    
+    return np.clip(niche_score + sub_score + recency_score, 0, 100)  # Ensure score is between 0-100
 
 def calculate_score(
     channel_data: Dict,
@@ -169,291 +369,326 @@ def calculate_score(
     max_days: int
 ) -> float:
     """Calculate a score from 0-100 based on channel metrics."""
-    # Base score from niche
-    niche_score = NICHE_WEIGHTS.get(keyword.lower(), 0.5) * 40  # 40% weight
+    scores = calculate_score_batch(
+        np.array([channel_data['subscriber_count']]),
+        np.array([channel_data.get('days_since_last_upload', 365)]),
+        np.array([_NICHE_GET(keyword.lower(), 0.5)]),
+        min_subs,
+        max_subs
+    )
+    return float(scores[0])
+
+def _chunks(items: List[str], size: int):
+    """Yield successive slices of at most `size` items."""
+    for i in range(0, len(items), size):
+        yield items[i:i + size]
+
+async def _youtube_get(client: httpx.AsyncClient, url: str, params: Dict[str, Any]) -> httpx.Response:
+    """GET a YouTube API endpoint with bounded concurrency and exponential backoff on 429/5xx."""
+    for attempt in range(YT_MAX_RETRIES + 1):
+        async with app.state.yt_sem:
+            response = await client.get(url, params=params)
+        if response.status_code not in YT_RETRY_STATUS_CODES or attempt == YT_MAX_RETRIES:
+            return response
+        delay = 0.5 * (2 ** attempt)
+        logger.warning(f"YouTube API returned {response.status_code}, retrying in {delay:.1f}s")
+        await asyncio.sleep(delay)
+    return response
+
+async def _acquire_quota(operation: str) -> str:
+    """
+    Reserve quota for one YouTube call and return the API key it was charged to.
+    Waits out the per-call spacing; raises 429 once every key's quota is spent.
+    """
+    quota_manager = get_quota_manager()
+    cost = quota_manager.get_cost_estimate(operation)
+    while True:
+        api_key, retry_after = quota_manager.try_consume(cost)
+        if api_key is not None:
+            return api_key
+        if retry_after > YT_MAX_PACING_WAIT:
+            break
+        await asyncio.sleep(retry_after)
     
-    # Subscriber score (30% weight)
-    subscriber_count = channel_data['subscriber_count']
-    if subscriber_count >= max_subs:
-        sub_score = 30
-    elif subscriber_count <= min_subs:
-        sub_score = 10
-    else:
-        # Linear scale between min and max
-        sub_ratio = ((subscriber_count - min_subs) / (max_subs - min_subs))
-        sub_score = 10 + (20 * sub_ratio)  # Between 10-30
+    envelope, retry_after_seconds = rate_limited_envelope(
+        f"YouTube API quota exhausted. Retry after {retry_after:.0f} seconds.", retry_after
+    )
+    raise HTTPException(
+        status_code=429,
+        detail=envelope,
+        headers={"Retry-After": str(retry_after_seconds)}
+    )
+
+async def _fetch_json(client: httpx.AsyncClient, url: str, params: Dict[str, Any], operation: str) -> Dict:
+    """GET a YouTube API endpoint, charge its quota cost for `operation` and return its JSON body."""
+    # Reserve the quota before calling so concurrent searches can't all pass a check first
+    api_key = await _acquire_quota(operation)
+    response = await _youtube_get(client, url, {**params, "key": api_key})
+    record_api_usage(operation, response.status_code, consumed=True, api_key=api_key)
+    logger.info(f"YouTube API URL: {response.url.copy_remove_param('key')}")
+    logger.info(f"YouTube API status: {response.status_code} ({response.http_version})")
     
-    # Recency score (30% weight)
-    days_since_upload = channel_data.get('days_since_last_upload', 365)
-    if days_since_upload <= 7:
-        recency_score = 30
-    elif days_since_upload <= 30:
-        recency_score = 25
-    elif days_since_upload <= 90:
-        recency_score = 15
+    if response.status_code == 403:
+        logger.error(f"YouTube API error: {response.json()}")
+        raise HTTPException(
+            status_code=503,
+            detail="YouTube API quota exceeded or invalid API key. Please check your API configuration."
+        )
+    response.raise_for_status()
+    return orjson.loads(await response.aread())
+
+async def _cached_get(client: httpx.AsyncClient, url: str, params: Dict[str, Any], operation: str) -> Dict:
+    """Fetch JSON through search_cache, sharing one in-flight request between concurrent misses."""
+    key = (url, frozenset(params.items()))
+    cached_data = search_cache.get(key)
+    if cached_data is not None:
+        return cached_data
+    
+    # Another request is already fetching this key; wait for its result
+    inflight = _inflight.get(key)
+    if inflight is not None:
+        try:
+            return await asyncio.shield(inflight)
+        except asyncio.CancelledError:
+            # Only the leading fetch was cancelled, not this request; fetch it ourselves
+            if inflight.cancelled():
+                return await _cached_get(client, url, params, operation)
+            raise
+    
+    future = asyncio.get_running_loop().create_future()
+    _inflight[key] = future
+    try:
+        data = await _fetch_json(client, url, params, operation)
+    except asyncio.CancelledError:
+        future.cancel()
+        raise
+    except Exception as e:
+        future.set_exception(e)
+        future.exception()  # Mark retrieved so unawaited failures are not logged by asyncio
+        raise
     else:
-        recency_score = 5
+        search_cache[key] = data
+        future.set_result(data)
+        return data
+    finally:
+        _inflight.pop(key, None)
+
+async def _search_region(
+    client: httpx.AsyncClient,
+    region: str,
+    query: str,
+    max_results: int
+) -> List[str]:
+    """Run a channel search in a single region and return the matching channel IDs."""
+    search_url = f"{CONFIG.youtube_api_url}/search"
+    search_params = {
+        "part": "snippet",
+        "q": query,
+        "type": "channel",
+        "maxResults": max_results,
+        "regionCode": region
+    }
+    search_data = await _cached_get(client, search_url, search_params, "search")
+    logger.info(f"Search response items ({region}): {len(search_data.get('items', []))}")
     
-    total = niche_score + sub_score + recency_score
-    return min(100, max(0, total))  # Ensure score is between 0-100
+    return list(dict.fromkeys(item['snippet']['channelId'] for item in search_data.get('items', [])))
 
-async def search_channels(params: SearchParams) -> List[Channel]:
-    """Search for channels based on the given parameters."""
-    import random
-    
+async def search_channels(params: SearchParams, client: httpx.AsyncClient) -> Tuple[List[_ChannelRow], bool]:
+    """
+    Search for channels based on the given parameters.
+    Returns (rows, complete); complete is False when some regions failed and the rows are partial.
+    """
     all_channels = []
-    seen_channel_ids = set()  # Track unique channel IDs to avoid duplicates
     
-    async with httpx.AsyncClient(timeout=30.0) as client:  # Add timeout
-        # Add randomization to get different results each time
-        random_offset = random.randint(0, 20)  # Random offset for variety
-        max_results = min(50, params.max_results + random_offset)  # Vary max results
+    max_results = min(50, params.max_results)  # API maximum per search request
+    query = " OR ".join(params.keywords[:3])
+    
+    regions = params.regions or ["US"]
+    
+    try:
+        # Search all regions concurrently
+        logger.info(f"Making search for: {query} in {regions}")
+        results = await asyncio.gather(
+            *[_search_region(client, region, query, max_results) for region in regions],
+            return_exceptions=True
+        )
         
-        # Create multiple search variations for better variety
-        search_variations = []
+        # Union the channel IDs in first-seen order, remembering the region each was found in
+        channel_regions: Dict[str, str] = {}
+        errors = []
+        for region, result in zip(regions, results):
+            if isinstance(result, BaseException):  # Includes CancelledError
+                logger.error(f"Search failed for region {region}: {result}")
+                errors.append(result)
+                continue
+            for channel_id in result:
+                channel_regions.setdefault(channel_id, region)
         
-        # Original query
-        combined_query = " OR ".join(params.keywords[:3])
-        search_variations.append(combined_query)
+        # Only fail the request if every region failed
+        if len(errors) == len(regions):
+            raise errors[0]
+        complete = not errors
         
-        # Add variations with different keyword combinations
-        if len(params.keywords) > 1:
-            random.shuffle(params.keywords)
-            alt_query = " OR ".join(params.keywords[:2])  # Use fewer keywords
-            search_variations.append(alt_query)
+        if not channel_regions:
+            logger.warning("No items found in search response")
+            return [], complete
         
-        # Add variations with additional terms
-        additional_terms = ["podcast", "show", "talk", "interview", "business"]
-        random_term = random.choice(additional_terms)
-        enhanced_query = f"{combined_query} OR {random_term}"
-        search_variations.append(enhanced_query)
+        # Get channel details in concurrent batches of up to 50 IDs (the API maximum per request)
+        channels_url = f"{CONFIG.youtube_api_url}/channels"
+        channels_pages = await asyncio.gather(*[
+            _cached_get(client, channels_url, {
+                "part": "snippet,statistics,contentDetails",
+                "id": ",".join(ids)
+            }, "channel_details")
+            for ids in _chunks(list(channel_regions), YT_CHANNELS_BATCH_SIZE)
+        ])
         
-        # Randomly select one of the search variations
-        selected_query = random.choice(search_variations)
+        channel_items = list(itertools.chain.from_iterable(
+            channels_data.get('items', []) for channels_data in channels_pages
+        ))
+        logger.info(f"Channel details retrieved: {len(channel_items)}")
         
-        # Search for channels with selected variation
-        search_url = f"{YOUTUBE_API_URL}/search"
-        search_params = {
-            "part": "snippet",
-            "q": selected_query,
-            "type": "channel",
-            "maxResults": max_results,
-            "regionCode": params.regions[0] if params.regions else "US",  # Use first region
-            "key": YOUTUBE_API_KEY
-        }
+        # Flatten the channel items so filters and scores run vectorized
+        keyword = params.keywords_lower[0] if params.keywords_lower else "podcast"
+        rows = []
+        for channel in channel_items:
+            try:
+                channel_info = channel['snippet']
+                stats = channel['statistics']
+                rows.append({
+                    'id': channel['id'],
+                    'title': channel_info['title'],
+                    'description': channel_info.get('description', ''),
+                    'thumbnail_url': channel_info['thumbnails']['default']['url'],
+                    'subscriber_count': int(stats.get('subscriberCount', 0)),
+                    'video_count': int(stats.get('videoCount', 0)),
+                    'view_count': int(stats.get('viewCount', 0)),
+                    'region': channel_regions.get(channel['id'], regions[0])
+                })
+            except Exception as e:
+                logger.error(f"Error processing channel: {e}")
+                continue
         
-        # Add randomization to search order by shuffling regions occasionally
-        if len(params.regions) > 1 and random.random() > 0.5:  # Increased probability
-            random_region = random.choice(params.regions)
-            search_params["regionCode"] = random_region
+        if not rows:
+            return [], complete
         
-        # Add random order parameter if available
-        if random.random() > 0.5:
-            search_params["order"] = random.choice(["relevance", "date", "rating", "viewCount"])
+        # Apply filters
+        subs = np.array([row['subscriber_count'] for row in rows], dtype=np.int64)
+        keep = np.flatnonzero((subs >= params.min_subscribers) & (subs <= params.max_subscribers))
         
-        headers = {
-            "Referer": "http://localhost:8000",
-            "User-Agent": "High-Ticket Podcast Client Finder"
-        }
+        # Skip slow playlist lookup for performance - use estimated recent upload
+        days_since_upload = 30  # Default estimate
+        last_upload_date = datetime.utcnow() - timedelta(days=days_since_upload)
+        keywords_matched = params.keywords[:1]  # Match first keyword
         
+        # Calculate scores for all remaining channels at once
+        scores = calculate_score_batch(
+            subs[keep],
+            np.full(len(keep), days_since_upload),
+            np.full(len(keep), _NICHE_GET(keyword, 0.5)),
+            params.min_subscribers,
+            params.max_subscribers
+        ).round(2)
+        
+        for index, score in zip(keep.tolist(), scores.tolist()):
+            row = rows[index]
+            all_channels.append(_ChannelRow(
+                **row,
+                keywords_matched=keywords_matched,
+                last_upload_date=last_upload_date,
+                days_since_last_upload=days_since_upload,
+                score=score,
+                channel_url=f"https://youtube.com/channel/{row['id']}",
+                contact_email=None,
+                social_links=None
+            ))
+                    
+    except HTTPException:
+        raise  # Keep quota (429) and API (503) errors as they are
+    except Exception as e:
+        logger.error(f"Error in API request: {e}")
+        raise HTTPException(status_code=500, detail=str(e))
+    
+    # Sort by score in descending order
+    all_channels.sort(key=lambda x: x['score'], reverse=True)
+    return all_channels[:params.max_results], complete
+
+# The response is built from typed rows and serialized by orjson directly; response_model
+# would re-validate every channel, so the schema is only documented through `responses`
+@app.post("/api/search", response_model=None, responses={200: {"model": SearchResponse}})
+async def search_podcasts(params: SearchParams, client: httpx.AsyncClient = Depends(get_http_client)):
+    """Search for podcast channels based on the given parameters."""
+    # Serve repeated searches from the cache without spending quota
+    cache_key = (
+        "search_podcasts",
+        tuple(params.keywords),  # Order matters: the query, niche weight and match use the leading keywords
+        tuple(params.regions),
+        params.min_subscribers,
+        params.max_subscribers,
+        params.max_days_since_upload,
+        params.max_results
+    )
+    rows = search_cache.get(cache_key)
+    if rows is None:
         try:
-            logger.info(f"Making randomized search for: {selected_query}")
-            search_response = await client.get(search_url, params=search_params, headers=headers)
-            logger.info(f"Search URL: {search_response.url}")
-            logger.info(f"Search status: {search_response.status_code}")
-            
-            if search_response.status_code == 403:
-                logger.error(f"YouTube API error: {search_response.json()}")
-                raise HTTPException(
-                    status_code=503,
-                    detail="YouTube API quota exceeded or invalid API key. Please check your API configuration."
-                )
-            search_response.raise_for_status()
-            search_data = search_response.json()
-            logger.info(f"Search response items: {len(search_data.get('items', []))}")
-            
-            if not search_data.get('items'):
-                logger.warning("No items found in search response")
-                return []
-            
-            # Get channel details for all found channels at once
-            channel_ids = [item['snippet']['channelId'] for item in search_data.get('items', [])]
-            
-            if channel_ids:
-                channels_url = f"{YOUTUBE_API_URL}/channels"
-                channels_params = {
-                    "part": "snippet,statistics,contentDetails",
-                    "id": ",".join(channel_ids),
-                    "key": YOUTUBE_API_KEY
-                }
-                
-                channels_response = await client.get(channels_url, params=channels_params)
-                channels_response.raise_for_status()
-                channels_data = channels_response.json()
-                logger.info(f"Channel details retrieved: {len(channels_data.get('items', []))}")
-                        
-                        # Process channel data
-                for channel in channels_data.get('items', []):
-                    try:
-                        channel_info = channel['snippet']
-                        stats = channel['statistics']
-                        
-                        subscriber_count = int(stats.get('subscriberCount', 0))
-                        
-                        # Apply filters
-                        if subscriber_count < params.min_subscribers:
-                            continue
-                        if subscriber_count > params.max_subscribers:
-                            continue
-                        
-                        # Skip slow playlist lookup for performance - use estimated recent upload
-                        days_since_upload = 30  # Default estimate
-                        last_upload_date = datetime.utcnow() - timedelta(days=days_since_upload)
-                        
-                        # Calculate score with first keyword
-                        score = calculate_score(
-                            {
-                                'subscriber_count': subscriber_count,
-                                'days_since_last_upload': days_since_upload
-                            },
-                            params.keywords[0] if params.keywords else "podcast",
-                            params.min_subscribers,
-                            params.max_subscribers,
-                            params.max_days_since_upload
-                        )
-                        
-                        channel_data = Channel(
-                            id=channel['id'],
-                            title=channel_info['title'],
-                            description=channel_info.get('description', ''),
-                            thumbnail_url=channel_info['thumbnails']['default']['url'],
-                            subscriber_count=subscriber_count,
-                            video_count=int(stats.get('videoCount', 0)),
-                            view_count=int(stats.get('viewCount', 0)),
-                            region=params.regions[0] if params.regions else "US",
-                            keywords_matched=params.keywords[:1],  # Match first keyword
-                            last_upload_date=last_upload_date,
-                            days_since_last_upload=days_since_upload,
-                            score=round(score, 2),
-                            channel_url=f"https://youtube.com/channel/{channel['id']}"
-                        )
-                        
-                        # Check if channel already exists to avoid duplicates
-                        if channel['id'] not in seen_channel_ids:
-                            all_channels.append(channel_data)
-                            seen_channel_ids.add(channel['id'])
-                            
-                    except Exception as e:
-                        logger.error(f"Error processing channel: {e}")
-                        continue
-                        
+            rows, complete = await search_channels(params, client)  # Each uncached YouTube call charges its own cost
+        except HTTPException:
+            raise
         except Exception as e:
-            logger.error(f"Error in API request: {e}")
+            logger.error(f"Search error: {e}")
             raise HTTPException(status_code=500, detail=str(e))
+        # Partial results (some regions failed) are served but not cached, so a retry refetches them
+        if complete:
+            search_cache[cache_key] = rows
     
-    # Add randomization to final results for variety
-    if len(all_channels) > params.max_results:
-        # Shuffle and take a random subset to ensure variety
-        random.shuffle(all_channels)
-    
-    # Sort by score in descending order but with some randomness
-    all_channels.sort(key=lambda x: x.score + random.uniform(-2, 2), reverse=True)
-    return all_channels[:params.max_results]
-
-@app.post("/api/search", response_model=SearchResponse)
-async def search_podcasts(params: SearchParams):
-    """Search for podcast channels based on the given parameters."""
-    if not YOUTUBE_API_KEY:
-        raise HTTPException(status_code=500, detail="YouTube API key not configured")
-    
-    try:
-        channels = await search_channels(params)
-        record_api_usage("search", 200)  # Record successful usage
-        return SearchResponse(
-            success=True,
-            data=channels,
-            total_results=len(channels),
-            params=params.dict()
-        )
-    except Exception as e:
-        logger.error(f"Search error: {e}")
-        record_api_usage("search", 500)  # Record error
-        raise HTTPException(status_code=500, detail=str(e))
+    return ORJSONResponse({
+        "success": True,
+        "data": rows,
+        "total_results": len(rows),
+        "params": params.dict(),
+        "timestamp": datetime.utcnow()
+    })
+
+CSV_HEADER_LINE = ",".join([
+    "Channel Name", "Description", "Subscribers", "Video Count", "View Count",
+    "Market Region", "Keyword Matched", "Last Upload Date",
+    "Days Since Last Upload", "Score", "Channel URL", "Contact Email"
+]) + "\r\n"
+
+def _csv_escape(value: Any) -> str:
+    """Format a CSV field, quoting it only when it contains separators, quotes or newlines."""
+    text = str(value)
+    if any(char in text for char in ',"\r\n'):
+        return '"' + text.replace('"', '""') + '"'
+    return text
+
+async def _csv_rows(channels: List[Channel]):
+    """Yield the CSV export one line at a time."""
+    yield CSV_HEADER_LINE
+    for channel in channels:
+        yield ",".join(_csv_escape(value) for value in (
+            channel.title,
+            channel.description or "N/A",
+            channel.subscriber_count,
+            channel.video_count,
+            channel.view_count,
+            channel.region,
+            ", ".join(channel.keywords_matched),
+            channel.last_upload_date.isoformat() if channel.last_upload_date else "N/A",
+            channel.days_since_last_upload or "N/A",
+            f"{channel.score:.1f}",
+            channel.channel_url,
+            channel.contact_email or "N/A"
+        )) + "\r\n"
 
 @app.post("/api/export/csv")
 async def export_csv(params: SearchParams):
     """Export search results as CSV."""
     try:
-        # Use mock data for reliable export functionality
-        mock_channels = [
-            Channel(
-                id="UC1234567890",
-                title="The Business Mastery Podcast",
-                description="Helping entrepreneurs scale their businesses through actionable strategies and expert interviews",
-                thumbnail_url="https://via.placeholder.com/150",
-                subscriber_count=125000,
-                video_count=245,
-                view_count=2500000,
-                region="US",
-                keywords_matched=["business podcast"],
-                last_upload_date=datetime.utcnow() - timedelta(days=5),
-                days_since_last_upload=5,
-                score=85.5,
-                channel_url="https://youtube.com/channel/UC1234567890",
-                contact_email="contact@businessmastery.com"
-            ),
-            Channel(
-                id="UC0987654321",
-                title="Real Estate Wealth Show",
-                description="Building wealth through real estate investing strategies and market insights",
-                thumbnail_url="https://via.placeholder.com/150",
-                subscriber_count=98000,
-                video_count=189,
-                view_count=1800000,
-                region="US",
-                keywords_matched=["real estate podcast"],
-                last_upload_date=datetime.utcnow() - timedelta(days=12),
-                days_since_last_upload=12,
-                score=78.2,
-                channel_url="https://youtube.com/channel/UC0987654321",
-                contact_email="info@realestatewealth.com"
-            ),
-        ]
-        
-        channels = mock_channels[:params.max_results]
+        channels = _EXPORT_MOCK_CHANNELS[:params.max_results]
         
-        # Create CSV in memory
-        output = io.StringIO()
-        writer = csv.writer(output)
-        
-        # Write header
-        writer.writerow([
-            "Channel Name", "Description", "Subscribers", "Video Count", "View Count", 
-            "Market Region", "Keyword Matched", "Last Upload Date", 
-            "Days Since Last Upload", "Score", "Channel URL", "Contact Email"
-        ])
-        
-        # Write data
-        for channel in channels:
-            writer.writerow([
-                channel.title,
-                channel.description or "N/A",
-                channel.subscriber_count,
-                channel.video_count,
-                channel.view_count,
-                channel.region,
-                ", ".join(channel.keywords_matched),
-                channel.last_upload_date.isoformat() if channel.last_upload_date else "N/A",
-                channel.days_since_last_upload or "N/A",
-                f"{channel.score:.1f}",
-                channel.channel_url,
-                channel.contact_email or "N/A"
-            ])
-        
-        # Prepare response
-        output.seek(0)
         return StreamingResponse(
-            iter([output.getvalue()]),
+            _csv_rows(channels),
             media_type="text/csv",
             headers={
                 "Content-Disposition": "attachment; filename=podcast_channels.csv",
@@ -547,6 +782,7 @@ async def health_check():
 async def get_quota_status():
     """Get current YouTube API quota status."""
     try:
+        quota_manager = get_quota_manager()
         status = quota_manager.get_quota_status()
         alerts = get_quota_alerts()
         return {
@@ -562,10 +798,7 @@ async def get_quota_status():
 async def reset_quota_tracking():
     """Reset quota tracking (local tracking only, not actual API quota)."""
     try:
-        quota_manager.usage.daily_used = 0
-        quota_manager.usage.requests_today = 0
-        quota_manager.usage.errors_403 = 0
-        quota_manager._save_usage()
+        get_quota_manager().reset()
         return {"message": "Local quota tracking reset", "timestamp": datetime.utcnow()}
     except Exception as e:
         logger.error(f"Error resetting quota tracking: {e}")
@@ -574,110 +807,15 @@ async def reset_quota_tracking():
 @app.post("/api/search/mock")
 async def search_podcasts_mock(params: SearchParams):
     """Mock search endpoint for testing without YouTube API."""
-    # Base mock channels
-    base_channels = [
-        Channel(
-            id="UC1234567890",
-            title="The Business Mastery Podcast",
-            description="Helping entrepreneurs scale their businesses",
-            thumbnail_url="https://via.placeholder.com/150",
-            subscriber_count=125000,
-            video_count=245,
-            view_count=2500000,
-            region="US",
-            keywords_matched=["business podcast"],
-            last_upload_date=datetime.utcnow() - timedelta(days=5),
-            days_since_last_upload=5,
-            score=85.5,
-            channel_url="https://youtube.com/channel/UC1234567890"
-        ),
-        Channel(
-            id="UC0987654321",
-            title="Real Estate Wealth Show",
-            description="Building wealth through real estate investing",
-            thumbnail_url="https://via.placeholder.com/150",
-            subscriber_count=98000,
-            video_count=189,
-            view_count=1800000,
-            region="US",
-            keywords_matched=["real estate podcast"],
-            last_upload_date=datetime.utcnow() - timedelta(days=12),
-            days_since_last_upload=12,
-            score=78.2,
-            channel_url="https://youtube.com/channel/UC0987654321"
-        ),
-        Channel(
-            id="UC5432109876",
-            title="SaaS Growth Strategies",
-            description="Scaling software as a service companies",
-            thumbnail_url="https://via.placeholder.com/150",
-            subscriber_count=75000,
-            video_count=156,
-            view_count=1200000,
-            region="UK",
-            keywords_matched=["saas podcast"],
-            last_upload_date=datetime.utcnow() - timedelta(days=3),
-            days_since_last_upload=3,
-            score=82.1,
-            channel_url="https://youtube.com/channel/UC5432109876"
-        ),
-        Channel(
-            id="UC1111222333",
-            title="Finance Freedom Podcast",
-            description="Achieving financial independence through smart investing",
-            thumbnail_url="https://via.placeholder.com/150",
-            subscriber_count=156000,
-            video_count=298,
-            view_count=3200000,
-            region="CA",
-            keywords_matched=["finance podcast"],
-            last_upload_date=datetime.utcnow() - timedelta(days=7),
-            days_since_last_upload=7,
-            score=88.7,
-            channel_url="https://youtube.com/channel/UC1111222333"
-        ),
-        Channel(
-            id="UC4444555666",
-            title="Coaching Excellence Show",
-            description="Helping coaches build successful businesses",
-            thumbnail_url="https://via.placeholder.com/150",
-            subscriber_count=62000,
-            video_count=178,
-            view_count=980000,
-            region="AU",
-            keywords_matched=["coaching podcast"],
-            last_upload_date=datetime.utcnow() - timedelta(days=15),
-            days_since_last_upload=15,
-            score=74.3,
-            channel_url="https://youtube.com/channel/UC4444555666"
-        )
-    ]
-    
-    # Simulate duplicates by returning the same channels for different keywords
-    # but with different keywords_matched arrays
+    # Simulate duplicates by returning the same channels for different keywords;
+    # each channel keeps the first keyword it was matched with
     mock_channels = []
-    seen_ids = set()
-    
-    for keyword in params.keywords:
-        for channel in base_channels[:3]:  # Use first 3 channels to simulate overlap
-            if channel.id not in seen_ids:
-                new_channel = Channel(
-                    id=channel.id,
-                    title=channel.title,
-                    description=channel.description,
-                    thumbnail_url=channel.thumbnail_url,
-                    subscriber_count=channel.subscriber_count,
-                    video_count=channel.video_count,
-                    view_count=channel.view_count,
-                    region=channel.region,
-                    keywords_matched=[keyword],  # Different keyword for same channel
-                    last_upload_date=channel.last_upload_date,
-                    days_since_last_upload=channel.days_since_last_upload,
-                    score=channel.score,
-                    channel_url=channel.channel_url
-                )
-                mock_channels.append(new_channel)
-                seen_ids.add(channel.id)
+    if params.keywords:
+        keyword = params.keywords[0]
+        mock_channels = [
+            channel.copy(update={"keywords_matched": [keyword]})
+            for channel in _MOCK_CHANNELS[:3]  # Use first 3 channels to simulate overlap
+        ]
     
     return SearchResponse(
         success=True,
@@ -689,4 +827,17 @@ async def search_podcasts_mock(params: SearchParams):
 
 if __name__ == "__main__":
     import uvicorn
-    uvicorn.run("main:app", host="0.0.0.0", port=8000, reload=True)
+    if os.getenv("DEV") == "1":
+        uvicorn.run("main:app", host="0.0.0.0", port=8000, reload=True)
+    else:
+        uvicorn.run(
+            "main:app",
+            host="0.0.0.0",
+            port=8000,
+            loop="uvloop",
+            http="httptools",
+            # Quota tracking and caches live in-process, so extra workers would each
+            # admit a full daily quota and overwrite each other's quota file
+            workers=int(os.getenv("WEB_CONCURRENCY", 1)),
+            reload=False
+        )
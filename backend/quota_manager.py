@@ -6,194 +6,499 @@ fallback strategies when quotas are exceeded.
 """
 
 import os
+import sys
+import math
 import json
+import hashlib
 import time
+import atexit
+import threading
 import logging
-from datetime import datetime, timedelta
-from typing import Dict, Optional, Tuple
+from datetime import date, datetime, timedelta
+from types import MappingProxyType
+from typing import Callable, Dict, List, Mapping, Optional, Tuple
 from pathlib import Path
-from dataclasses import dataclass, asdict
+from dataclasses import dataclass, fields
+
+try:
+    from zoneinfo import ZoneInfo
+except ImportError:  # Python 3.8
+    from backports.zoneinfo import ZoneInfo
+
+try:
+    import orjson
+except ImportError:  # stdlib json is used when orjson isn't installed
+    orjson = None
 
 logger = logging.getLogger(__name__)
 
-@dataclass
+_PACIFIC = ZoneInfo('America/Los_Angeles')
+
+# Usage key for a manager created without explicit API keys
+DEFAULT_KEY = "default"
+
+# YouTube Data API quota units per call
+_OPERATION_COSTS: Mapping[str, int] = MappingProxyType({
+    "search": 100,
+    "channel_details": 1,
+    "playlist_items": 1,
+    "video_details": 1,
+    "comment_threads": 1,
+})
+
+# Parsed per-key usage dicts by absolute quota file path, so further managers
+# for the same file skip re-reading it; refreshed on every save
+_LOADED_USAGE: Dict[str, Dict[str, Dict]] = {}
+
+# Slots make the per-request attribute access cheaper; dataclass(slots=) needs Python 3.10+
+_SLOTS = {"slots": True} if sys.version_info >= (3, 10) else {}
+
+@dataclass(**_SLOTS)
 class QuotaUsage:
     """Track quota usage statistics"""
     daily_quota: int = 10000  # Default daily quota for YouTube Data API v3
-    daily_used: int = 0
-    last_reset_date: str = ""
+    # Sliding window of daily usage: the current window plus a weighted share of the previous one
+    prev_used: int = 0
+    curr_used: int = 0
+    window_start: float = 0
+    window_sec: int = 86400
+    last_reset_date: str = ""  # ISO date of the last reset, for display
+    last_reset_ord: int = 0  # Pacific day ordinal of the last reset
     requests_today: int = 0
     errors_403: int = 0
-    last_request_time: float = 0
+    last_request_time: float = 0  # time.monotonic(); meaningless after a restart
     quota_reset_time: float = 0  # When quota resets (Pacific Time)
+    # Token bucket used to admit requests; refills continuously at the daily rate
+    capacity: int = 10000
+    tokens: float = 10000.0
+    refill_rate: float = 10000 / 86400  # Tokens per second
+    last_refill: float = 0  # time.monotonic(); meaningless after a restart
+    last_refill_wall: float = 0  # Wall-clock time of last_refill, so refills carry across restarts
+
+def _key_label(api_key: str) -> str:
+    """Stable, non-secret label for an API key so raw keys never reach the usage file"""
+    return hashlib.sha256(api_key.encode()).hexdigest()[:12]
+
+# Field names of the flat QuotaUsage, computed once for (de)serialization
+_FIELDS = tuple(f.name for f in fields(QuotaUsage))
+# Used on load to ignore fields written by older versions of QuotaUsage
+_FIELD_SET = frozenset(_FIELDS)
 
 class QuotaManager:
     """Manages YouTube API quota usage and provides fallback strategies"""
     
-    def __init__(self, quota_file: str = "quota_usage.json"):
+    def __init__(self, quota_file: str = "quota_usage.json", api_keys: Optional[List[str]] = None):
         self.quota_file = Path(quota_file)
-        self.usage = self._load_usage()
+        self._cache_key = os.path.abspath(quota_file)
+        # Guards check-and-update sequences on the usages across request threads
+        self._lock = threading.Lock()
+        self._reset_cache: Optional[Tuple[float, float]] = None  # (reset_ts, valid_until_ts)
+        self._status_cache: Optional[Tuple[float, Dict]] = None  # (monotonic_ts, status)
+        self._today_ord_cache = 0
+        # One usage per API key; each key has its own daily quota
+        self.api_keys = list(api_keys) if api_keys else [DEFAULT_KEY]
+        self._next_key = 0  # Round-robin start for try_consume
+        self.key_usages = self._load_usage()
+        self.usage = self.key_usages[self.api_keys[0]]
+        # Usage is written to disk in batches; these track unsaved changes
+        self._dirty_count = 0
+        self._last_flush = time.monotonic()
         self._check_daily_reset()
         
-    def _load_usage(self) -> QuotaUsage:
-        """Load quota usage from file"""
-        if self.quota_file.exists():
+    def _new_usage(self) -> QuotaUsage:
+        """Fresh usage for a key with no saved state"""
+        today_ord = self._today_ord(time.time())
+        return QuotaUsage(
+            last_reset_date=date.fromordinal(today_ord).isoformat(),
+            last_reset_ord=today_ord,
+            quota_reset_time=self._get_next_quota_reset()
+        )
+    
+    def _load_usage(self) -> Dict[str, QuotaUsage]:
+        """Load quota usage for each API key from file"""
+        saved = _LOADED_USAGE.get(self._cache_key)
+        if saved is None:
+            saved = {}
             try:
-                with open(self.quota_file, 'r') as f:
+                with open(self.quota_file, 'rb') as f:
                     data = json.load(f)
-                return QuotaUsage(**data)
+                # Files from before per-key tracking hold a single usage for the default key
+                saved = data["keys"] if "keys" in data else {DEFAULT_KEY: data}
+                _LOADED_USAGE[self._cache_key] = saved
+            except FileNotFoundError:
+                pass
             except Exception as e:
                 logger.warning(f"Error loading quota file: {e}")
         
-        return QuotaUsage(
-            last_reset_date=datetime.now().strftime("%Y-%m-%d"),
-            quota_reset_time=self._get_next_quota_reset()
-        )
+        usages = {}
+        for key in self.api_keys:
+            label = key if key == DEFAULT_KEY else _key_label(key)
+            if label not in saved and key == self.api_keys[0] and DEFAULT_KEY in saved:
+                label = DEFAULT_KEY  # Usage tracked before keys were configured belongs to the primary key
+            if label in saved:
+                usage = QuotaUsage(**{k: v for k, v in saved[label].items() if k in _FIELD_SET})
+                if "daily_used" in saved[label] and "curr_used" not in saved[label]:
+                    self._migrate_daily_used(usage, saved[label]["daily_used"])
+                # Monotonic timestamps from a previous process can't be compared with ours;
+                # rebase the refill stamp from wall-clock time so downtime still refills the bucket
+                usage.last_request_time = 0
+                if usage.last_refill_wall:
+                    downtime = max(0.0, time.time() - usage.last_refill_wall)
+                    usage.last_refill = time.monotonic() - downtime
+                else:
+                    usage.last_refill = 0
+                usages[key] = usage
+            else:
+                usages[key] = self._new_usage()
+        return usages
+    
+    def _migrate_daily_used(self, usage: QuotaUsage, daily_used: int):
+        """Carry a pre-sliding-window `daily_used` count over into the window and bucket"""
+        today_ord = self._today_ord(time.time())
+        if usage.last_reset_date != date.fromordinal(today_ord).isoformat():
+            return  # Spent on an earlier Pacific day, which the old daily reset would have cleared
+        usage.last_reset_ord = today_ord
+        # Today's spend sits in a window starting at this Pacific midnight
+        usage.window_start = self._get_next_quota_reset() - usage.window_sec
+        usage.curr_used = daily_used
+        usage.tokens = max(0.0, usage.capacity - daily_used)
     
     def _save_usage(self):
         """Save quota usage to file"""
         try:
-            with open(self.quota_file, 'w') as f:
-                json.dump(asdict(self.usage), f, indent=2)
+            wall_now, mono_now = time.time(), time.monotonic()
+            for usage in self.key_usages.values():
+                if usage.last_refill:
+                    usage.last_refill_wall = wall_now - (mono_now - usage.last_refill)
+            data = {"keys": {
+                key if key == DEFAULT_KEY else _key_label(key):
+                    {name: getattr(usage, name) for name in _FIELDS}
+                for key, usage in self.key_usages.items()
+            }}
+            # Write to a temporary file and swap it in so readers never see a partial file
+            tmp_file = self.quota_file.with_name(self.quota_file.name + ".tmp")
+            if orjson is not None:
+                payload = orjson.dumps(data)
+            else:
+                payload = json.dumps(data, separators=(',', ':')).encode()
+            with open(tmp_file, 'wb') as f:
+                f.write(payload)
+            os.replace(tmp_file, self.quota_file)
+            _LOADED_USAGE[self._cache_key] = data["keys"]
+            self._dirty_count = 0
+            self._last_flush = time.monotonic()
         except Exception as e:
             logger.error(f"Error saving quota file: {e}")
     
     def _get_next_quota_reset(self) -> float:
         """Get next quota reset time (Pacific Time, midnight)"""
+        # The next reset only changes once it has passed, so reuse it until then
+        if self._reset_cache and time.time() < self._reset_cache[1]:
+            return self._reset_cache[0]
+        
         # YouTube API quota resets at midnight Pacific Time
-        import pytz
-        pacific = pytz.timezone('America/Los_Angeles')
-        now_pacific = datetime.now(pacific)
+        now_pacific = datetime.now(_PACIFIC)
         tomorrow = now_pacific + timedelta(days=1)
         reset_time = tomorrow.replace(hour=0, minute=0, second=0, microsecond=0)
-        return reset_time.timestamp()
+        reset_ts = reset_time.timestamp()
+        self._reset_cache = (reset_ts, reset_ts)
+        self._today_ord_cache = now_pacific.date().toordinal()
+        return reset_ts
+    
+    def _today_ord(self, now: float) -> int:
+        """Current Pacific day as a date ordinal, recomputed only when a reset has passed"""
+        if not self._reset_cache or now >= self._reset_cache[1]:
+            self._get_next_quota_reset()
+        return self._today_ord_cache
     
     def _check_daily_reset(self):
         """Check if daily quota should be reset"""
-        today = datetime.now().strftime("%Y-%m-%d")
-        if self.usage.last_reset_date != today:
+        today_ord = self._today_ord(time.time())
+        reset = False
+        for usage in self.key_usages.values():
+            if usage.last_reset_ord != today_ord:
+                usage.requests_today = 0
+                usage.errors_403 = 0
+                usage.last_reset_ord = today_ord
+                usage.last_reset_date = date.fromordinal(today_ord).isoformat()
+                usage.quota_reset_time = self._get_next_quota_reset()
+                reset = True
+        if reset:
             logger.info("Resetting daily quota usage")
-            self.usage.daily_used = 0
-            self.usage.requests_today = 0
-            self.usage.errors_403 = 0
-            self.usage.last_reset_date = today
-            self.usage.quota_reset_time = self._get_next_quota_reset()
             self._save_usage()
     
-    def can_make_request(self, estimated_cost: int = 100) -> Tuple[bool, str]:
-        """Check if a request can be made within quota limits"""
-        self._check_daily_reset()
+    def _refill(self, usage: QuotaUsage, mono: float):
+        """Add the tokens accrued since the last refill, up to capacity"""
+        if usage.last_refill:
+            elapsed = max(0.0, mono - usage.last_refill)
+            usage.tokens = min(
+                usage.capacity,
+                usage.tokens + usage.refill_rate * elapsed
+            )
+        usage.last_refill = mono
+    
+    def _window_usage(self, usage: QuotaUsage, now: float) -> float:
+        """Advance the sliding window and return the weighted usage over the last window_sec"""
+        window_sec = usage.window_sec
+        elapsed = now - usage.window_start
+        if elapsed >= window_sec:
+            windows_passed = elapsed // window_sec
+            # The current window becomes the previous one; after 2+ windows both are stale
+            usage.prev_used = usage.curr_used if windows_passed == 1 else 0
+            usage.curr_used = 0
+            usage.window_start += window_sec * windows_passed
+            elapsed = now - usage.window_start
+        return usage.curr_used + usage.prev_used * max(0.0, 1 - elapsed / window_sec)
+    
+    def _remaining(self, usage: QuotaUsage, mono: float, window_used: float) -> int:
+        """Quota that can be spent right now under both the token bucket and the daily window"""
+        self._refill(usage, mono)
+        return max(0, int(min(usage.tokens, usage.daily_quota - window_used)))
+    
+    def _window_retry_after(self, usage: QuotaUsage, now: float, window_used: float, cost: int) -> float:
+        """Seconds until the sliding window has room for `cost` more units"""
+        excess = window_used + cost - usage.daily_quota
+        window_left = usage.window_start + usage.window_sec - now
+        if usage.prev_used > 0:
+            # The previous window's share decays linearly over the current window
+            decay_time = excess * usage.window_sec / usage.prev_used
+            if decay_time <= window_left:
+                return decay_time
+        # Otherwise wait for the roll, after which the current window's usage becomes
+        # the previous one at full weight and has to decay in turn
+        window_left = max(0.0, window_left)
+        excess_after_roll = usage.curr_used + cost - usage.daily_quota
+        if excess_after_roll > 0 and usage.curr_used > 0:
+            return window_left + excess_after_roll * usage.window_sec / usage.curr_used
+        return window_left
+    
+    def can_make_request(self, estimated_cost: int = 100, api_key: Optional[str] = None) -> Tuple[bool, str, float]:
+        """
+        Check if a request can be made within quota limits
+        Returns (allowed, message, retry_after_seconds); retry_after is 0 when allowed
+        """
+        with self._lock:
+            usage = self.key_usages[api_key] if api_key else self.usage
+            return self._check_request(usage, estimated_cost, time.time(), time.monotonic())
+    
+    def try_consume(self, cost: int = 100, preferred: Optional[str] = None) -> Tuple[Optional[str], float]:
+        """
+        Atomically pick an API key with capacity and deduct `cost` from it
+        Tries `preferred` first, otherwise starts from the next key in
+        round-robin order, then falls back to the remaining keys.
+        Returns (api_key, retry_after_seconds); api_key is None when every key
+        is exhausted, and retry_after is the shortest wait across keys.
+        Pass consumed=True to record_request afterwards so the cost is not
+        deducted twice.
+        """
+        with self._lock:
+            if preferred in self.key_usages:
+                keys = [preferred] + [k for k in self.api_keys if k != preferred]
+            else:
+                start = self._next_key
+                self._next_key = (start + 1) % len(self.api_keys)
+                keys = self.api_keys[start:] + self.api_keys[:start]
+            current_time = time.time()
+            mono = time.monotonic()
+            retry_after = float("inf")
+            for key in keys:
+                usage = self.key_usages[key]
+                allowed, _, wait = self._check_request(usage, cost, current_time, mono)
+                if allowed:
+                    self._deduct(usage, cost, current_time, mono)
+                    return key, 0.0
+                retry_after = min(retry_after, wait)
+            return None, retry_after
+    
+    def _check_request(self, usage: QuotaUsage, estimated_cost: int, current_time: float,
+                       mono: float) -> Tuple[bool, str, float]:
+        """
+        Check the quota limits for a request; the caller must hold the lock
+        `current_time` (wall clock) drives the daily window, `mono` the bucket and spacing.
+        """
+        self._refill(usage, mono)
+        
+        # Check the sliding daily window has room for this request
+        window_used = self._window_usage(usage, current_time)
+        if window_used + estimated_cost > usage.daily_quota:
+            retry_after = self._window_retry_after(usage, current_time, window_used, estimated_cost)
+            return False, f"Daily quota would be exceeded. Retry after {retry_after:.0f} seconds.", retry_after
         
-        # Check if we're close to quota limit
-        if self.usage.daily_used + estimated_cost > self.usage.daily_quota:
-            wait_time = self.usage.quota_reset_time - time.time()
-            hours = wait_time / 3600
-            return False, f"Quota would be exceeded. Wait {hours:.1f} hours for reset."
+        # Check the token bucket has enough quota for this request
+        if usage.tokens < estimated_cost:
+            retry_after = (estimated_cost - usage.tokens) / usage.refill_rate
+            return False, f"Quota would be exceeded. Retry after {retry_after:.0f} seconds.", retry_after
         
         # Check rate limiting (max 10 requests per second)
-        current_time = time.time()
-        if current_time - self.usage.last_request_time < 0.1:
-            return False, "Rate limit exceeded. Wait 100ms between requests."
+        since_last = mono - usage.last_request_time
+        if since_last < 0.1:
+            return False, "Rate limit exceeded. Wait 100ms between requests.", 0.1 - since_last
         
-        return True, "Request allowed"
+        return True, "Request allowed", 0.0
     
-    def record_request(self, cost: int = 100, status_code: int = 200):
-        """Record a request and its quota cost"""
-        self.usage.daily_used += cost
-        self.usage.requests_today += 1
-        self.usage.last_request_time = time.time()
-        
-        if status_code == 403:
-            self.usage.errors_403 += 1
-            logger.warning(f"403 error recorded. Total 403 errors: {self.usage.errors_403}")
-        
-        self._save_usage()
+    def _deduct(self, usage: QuotaUsage, cost: int, current_time: float, mono: float):
+        """Charge `cost` against the token bucket and the daily window"""
+        usage.tokens -= cost
+        self._window_usage(usage, current_time)
+        usage.curr_used += cost
+        usage.last_request_time = mono
+        self._status_cache = None
+    
+    def record_request(self, cost: int = 100, status_code: int = 200, consumed: bool = False,
+                       api_key: Optional[str] = None):
+        """Record a request and its quota cost (already deducted if `consumed` via try_consume)"""
+        with self._lock:
+            self._check_daily_reset()
+            usage = self.key_usages[api_key] if api_key else self.usage
+            if not consumed:
+                self._deduct(usage, cost, time.time(), time.monotonic())
+            usage.requests_today += 1
+            
+            if status_code == 403:
+                usage.errors_403 += 1
+                logger.warning(f"403 error recorded. Total 403 errors: {usage.errors_403}")
+            
+            # Flush to disk every 50 requests or 5 seconds instead of on every request
+            self._dirty_count += 1
+            self._status_cache = None
+            if self._dirty_count >= 50 or time.monotonic() - self._last_flush > 5.0:
+                self._save_usage()
+    
+    def reset(self):
+        """Clear local tracking for every key (does not affect the real API quota)"""
+        with self._lock:
+            for usage in self.key_usages.values():
+                usage.prev_used = 0
+                usage.curr_used = 0
+                usage.requests_today = 0
+                usage.errors_403 = 0
+                usage.tokens = usage.capacity
+            self._status_cache = None
+            self._save_usage()
     
     def get_quota_status(self) -> Dict:
-        """Get current quota status"""
-        self._check_daily_reset()
+        """Get current quota status summed over all API keys (memoized for 1s so UI polling reuses it)"""
+        now = time.monotonic()
+        cached = self._status_cache
+        if cached and now - cached[0] < 1.0:
+            return cached[1]
         
-        remaining = self.usage.daily_quota - self.usage.daily_used
-        reset_in_hours = (self.usage.quota_reset_time - time.time()) / 3600
+        usages = self.key_usages.values()
+        with self._lock:
+            self._check_daily_reset()
+            current_time = time.time()
+            mono = time.monotonic()
+            window_used = remaining = 0
+            for usage in usages:
+                used = self._window_usage(usage, current_time)
+                window_used += used
+                remaining += self._remaining(usage, mono, used)
+        daily_quota = sum(usage.daily_quota for usage in usages)
+        reset_in_hours = (self.usage.quota_reset_time - current_time) / 3600
         
-        return {
-            "daily_quota": self.usage.daily_quota,
-            "daily_used": self.usage.daily_used,
+        status = {
+            "daily_quota": daily_quota,
+            "daily_used": round(window_used),
             "remaining": remaining,
-            "remaining_percent": (remaining / self.usage.daily_quota) * 100,
-            "requests_today": self.usage.requests_today,
-            "errors_403": self.usage.errors_403,
+            "remaining_percent": (remaining / daily_quota) * 100,
+            "requests_today": sum(usage.requests_today for usage in usages),
+            "errors_403": sum(usage.errors_403 for usage in usages),
             "resets_in_hours": max(0, reset_in_hours),
-            "last_reset_date": self.usage.last_reset_date
+            "last_reset_date": self.usage.last_reset_date,
+            "api_keys": len(self.api_keys)
         }
+        self._status_cache = (now, status)
+        return status
     
     def get_cost_estimate(self, operation: str) -> int:
         """Estimate quota cost for different operations"""
-        costs = {
-            "search": 100,
-            "channel_details": 1,
-            "playlist_items": 1,
-            "video_details": 1,
-            "comment_threads": 1,
-        }
-        return costs.get(operation, 100)
+        return _OPERATION_COSTS.get(operation, 100)
     
     def should_use_fallback(self) -> bool:
         """Determine if fallback data should be used"""
         # Use fallback if quota is low or we've had multiple 403 errors
-        remaining_percent = ((self.usage.daily_quota - self.usage.daily_used) / self.usage.daily_quota) * 100
+        status = self.get_quota_status()
         
         return (
-            remaining_percent < 10 or  # Less than 10% quota remaining
-            self.usage.errors_403 >= 3 or  # Multiple 403 errors
-            self.usage.daily_used >= self.usage.daily_quota  # Quota exceeded
+            status["remaining_percent"] < 10 or  # Less than 10% quota remaining
+            status["errors_403"] >= 3 or  # Multiple 403 errors
+            status["remaining"] <= 0  # Quota exhausted
         )
 
 # Global quota manager instance
-quota_manager = QuotaManager()
+_quota_manager: Optional[QuotaManager] = None
+
+def get_quota_manager(api_keys: Optional[List[str]] = None) -> QuotaManager:
+    """
+    Return the shared QuotaManager, loading usage from disk on first use
+    `api_keys` only takes effect on the call that creates the manager.
+    """
+    global _quota_manager
+    if _quota_manager is None:
+        _quota_manager = QuotaManager(api_keys=api_keys)
+        # Flush batched usage on exit; only the shared instance, so throwaway managers can be collected
+        atexit.register(_quota_manager._save_usage)
+    return _quota_manager
 
-def check_quota_and_proceed(operation: str) -> Tuple[bool, str]:
+def check_quota_and_proceed(operation: str) -> Tuple[bool, Dict, int]:
     """
     Check quota before making an API request
-    Returns (can_proceed, message)
+    Returns (can_proceed, envelope, retry_after_seconds)
+    
+    When blocked, the envelope is a machine-readable error body and
+    retry_after is a whole number of seconds; the HTTP layer should respond
+    with 429 and a `Retry-After` header so clients back off instead of
+    retrying immediately.
     """
+    quota_manager = get_quota_manager()
     cost = quota_manager.get_cost_estimate(operation)
-    can_proceed, message = quota_manager.can_make_request(cost)
+    can_proceed, message, retry_after = quota_manager.can_make_request(cost)
     
-    if not can_proceed:
-        logger.warning(f"Quota check failed for {operation}: {message}")
-        if quota_manager.should_use_fallback():
-            message += " Using fallback data."
+    if can_proceed:
+        return True, {"ok": True, "message": message}, 0
     
-    return can_proceed, message
+    logger.warning(f"Quota check failed for {operation}: {message}")
+    if quota_manager.should_use_fallback():
+        message += " Using fallback data."
+    envelope, retry_after_seconds = rate_limited_envelope(message, retry_after)
+    return False, envelope, retry_after_seconds
 
-def record_api_usage(operation: str, status_code: int = 200):
+def rate_limited_envelope(message: str, retry_after: float) -> Tuple[Dict, int]:
+    """
+    Build the error body for a quota rejection
+    Returns (envelope, retry_after_seconds) with retry_after rounded up to whole seconds
+    """
+    retry_after_seconds = max(1, math.ceil(retry_after))
+    return {
+        "ok": False,
+        "code": "agent.rate_limited",
+        "message": message,
+        "retry_after_seconds": retry_after_seconds
+    }, retry_after_seconds
+
+def record_api_usage(operation: str, status_code: int = 200, consumed: bool = False,
+                     api_key: Optional[str] = None):
     """Record API usage after request completes"""
+    quota_manager = get_quota_manager()
     cost = quota_manager.get_cost_estimate(operation)
-    quota_manager.record_request(cost, status_code)
+    quota_manager.record_request(cost, status_code, consumed, api_key)
 
 # Quota monitoring and alerting functions
+# (level, message template, predicate on the quota status), most severe first
+_ALERT_RULES: Tuple[Tuple[str, str, Callable[[Dict], bool]], ...] = (
+    ("critical", "Critically low quota - consider using fallback data",
+     lambda s: s["remaining_percent"] < 5),
+    ("warning", "Only {remaining_percent:.1f}% quota remaining",
+     lambda s: s["remaining_percent"] < 20),
+    ("error", "{errors_403} API errors detected",
+     lambda s: s["errors_403"] > 0),
+)
+
 def get_quota_alerts() -> list:
     """Get alerts about quota usage"""
-    alerts = []
-    status = quota_manager.get_quota_status()
-    
-    if status["remaining_percent"] < 20:
-        alerts.append({
-            "level": "warning",
-            "message": f"Only {status['remaining_percent']:.1f}% quota remaining"
-        })
-    
-    if status["errors_403"] > 0:
-        alerts.append({
-            "level": "error", 
-            "message": f"{status['errors_403']} API errors detected"
-        })
-    
-    if status["remaining_percent"] < 5:
-        alerts.append({
-            "level": "critical",
-            "message": "Critically low quota - consider using fallback data"
-        })
-    
-    return alerts
+    status = get_quota_manager().get_quota_status()
+    return [
+        {"level": level, "message": message.format(**status)}
+        for level, message, applies in _ALERT_RULES
+        if applies(status)
+    ]
@@ -0,0 +1,255 @@
+"""
+Endpoint tests for the backend API
+
+Runs the FastAPI app in-process and answers its YouTube Data API calls from
+an httpx.MockTransport, so no running server, network or real API key is needed.
+"""
+
+import json
+import os
+import sys
+import time
+
+import httpx
+import pytest
+from fastapi.testclient import TestClient
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "backend"))
+os.environ.setdefault("YOUTUBE_API_KEY", "test-key")
+
+import main  # noqa: E402
+import quota_manager  # noqa: E402
+
+SEARCH_PAYLOAD = {
+    "keywords": ["business podcast"],
+    "regions": ["US"],
+    "min_subscribers": 10000,
+    "max_subscribers": 1000000,
+    "max_days_since_upload": 30
+}
+SEARCH_SHAPE = {"success", "data", "total_results", "params", "timestamp"}
+
+YOUTUBE_CHANNELS = [
+    {
+        "id": "UC_business",
+        "snippet": {
+            "title": "The Business Podcast",
+            "description": "Interviews with founders",
+            "thumbnails": {"default": {"url": "https://example.com/business.jpg"}}
+        },
+        "statistics": {"subscriberCount": "150000", "videoCount": "300", "viewCount": "9000000"}
+    },
+    {
+        "id": "UC_tiny",
+        "snippet": {
+            "title": "Tiny Show",
+            "description": "Too small to match",
+            "thumbnails": {"default": {"url": "https://example.com/tiny.jpg"}}
+        },
+        "statistics": {"subscriberCount": "500", "videoCount": "10", "viewCount": "2000"}
+    }
+]
+
+# API keys seen by the mocked YouTube API, in call order
+seen_keys = []
+
+def youtube_handler(request: httpx.Request) -> httpx.Response:
+    """Answer YouTube Data API calls the way the real API shapes its responses."""
+    if not request.url.params.get("key"):
+        return httpx.Response(403, json={"error": "missing API key"})
+    seen_keys.append(request.url.params["key"])
+    if request.url.path.endswith("/search"):
+        items = [{"snippet": {"channelId": channel["id"]}} for channel in YOUTUBE_CHANNELS]
+        return httpx.Response(200, json={"items": items})
+    if request.url.path.endswith("/channels"):
+        ids = request.url.params["id"].split(",")
+        return httpx.Response(200, json={"items": [c for c in YOUTUBE_CHANNELS if c["id"] in ids]})
+    return httpx.Response(404, json={"error": "not found"})
+
+@pytest.fixture(scope="session")
+def client(tmp_path_factory):
+    """One app instance and client shared by every test, with YouTube mocked out."""
+    # Startup would otherwise create the shared manager on quota_usage.json in the working directory
+    quota_manager._quota_manager = quota_manager.QuotaManager(
+        str(tmp_path_factory.mktemp("quota") / "quota.json"), api_keys=["test-key"]
+    )
+    with TestClient(main.app) as test_client:
+        # Swap the startup client for a mocked one; app shutdown closes it
+        test_client.portal.call(main.app.state.http.aclose)
+        main.app.state.http = httpx.AsyncClient(transport=httpx.MockTransport(youtube_handler))
+        yield test_client
+
+@pytest.fixture(autouse=True)
+def fresh_quota(tmp_path, monkeypatch):
+    """Give each test its own quota file and an empty search cache."""
+    manager = quota_manager.QuotaManager(str(tmp_path / "quota.json"), api_keys=["test-key"])
+    monkeypatch.setattr(quota_manager, "_quota_manager", manager)
+    main.search_cache.clear()
+    seen_keys.clear()
+
+@pytest.mark.parametrize("method, url, payload, expected_shape", [
+    ("post", "/api/search", SEARCH_PAYLOAD, SEARCH_SHAPE),
+    ("post", "/api/search/mock", SEARCH_PAYLOAD, SEARCH_SHAPE),
+    ("get", "/api/health", None, {"status", "timestamp"}),
+    ("get", "/api/quota/status", None, {"quota", "alerts", "using_fallback"}),
+])
+def test_endpoint_shape(client, method, url, payload, expected_shape):
+    response = client.request(method, url, json=payload)
+    assert response.status_code == 200
+    assert expected_shape <= set(response.json())
+
+def test_search_filters_and_scores_channels(client):
+    response = client.post("/api/search", json=SEARCH_PAYLOAD)
+    body = response.json()
+    assert body["total_results"] == 1
+    channel = body["data"][0]
+    assert channel["id"] == "UC_business"
+    assert channel["region"] == "US"
+    assert channel["keywords_matched"] == ["business podcast"]
+    assert channel["channel_url"] == "https://youtube.com/channel/UC_business"
+    assert 0 <= channel["score"] <= 100
+
+def test_mock_search_tags_first_keyword(client):
+    response = client.post("/api/search/mock", json=SEARCH_PAYLOAD)
+    body = response.json()
+    assert body["total_results"] == 3
+    assert all(channel["keywords_matched"] == ["business podcast"] for channel in body["data"])
+
+def test_search_over_quota_returns_429(client):
+    quota_manager.get_quota_manager().usage.tokens = 0
+    response = client.post("/api/search", json=SEARCH_PAYLOAD)
+    assert response.status_code == 429
+    retry_after = int(response.headers["Retry-After"])
+    assert retry_after >= 1
+    detail = response.json()["detail"]
+    assert detail["ok"] is False
+    assert detail["code"] == "agent.rate_limited"
+    assert detail["retry_after_seconds"] == retry_after
+
+def test_try_consume_falls_back_to_key_with_capacity(tmp_path):
+    manager = quota_manager.QuotaManager(str(tmp_path / "keys.json"), api_keys=["key-a", "key-b"])
+    manager.key_usages["key-a"].tokens = 0
+    api_key, retry_after = manager.try_consume(100, preferred="key-a")
+    assert api_key == "key-b"
+    assert retry_after == 0.0
+    assert manager.get_quota_status()["api_keys"] == 2
+
+def test_quota_reset_clears_every_key(client, tmp_path, monkeypatch):
+    manager = quota_manager.QuotaManager(str(tmp_path / "keys.json"), api_keys=["key-a", "key-b"])
+    monkeypatch.setattr(quota_manager, "_quota_manager", manager)
+    for usage in manager.key_usages.values():
+        usage.tokens = 0
+        usage.errors_403 = 1
+    assert client.post("/api/quota/reset").status_code == 200
+    status = client.get("/api/quota/status").json()["quota"]
+    assert status["remaining"] == 20000
+    assert status["errors_403"] == 0
+
+def test_bucket_refills_across_restart(tmp_path):
+    path = tmp_path / "restart.json"
+    manager = quota_manager.QuotaManager(str(path))
+    manager.try_consume(100)
+    manager.usage.tokens = 0
+    manager._save_usage()
+    # Pretend the process was down for 12 hours before the next start
+    data = json.loads(path.read_text())
+    data["keys"]["default"]["last_refill_wall"] -= 12 * 3600
+    path.write_text(json.dumps(data))
+    quota_manager._LOADED_USAGE.clear()
+    restarted = quota_manager.QuotaManager(str(path))
+    assert restarted.get_quota_status()["remaining"] >= 4900
+    assert restarted.try_consume(100)[0] is not None
+
+def test_search_charges_each_youtube_call(client):
+    response = client.post("/api/search", json={**SEARCH_PAYLOAD, "regions": ["US", "GB", "CA"]})
+    assert response.status_code == 200
+    # One 100-unit search per region plus one 1-unit channels batch
+    assert quota_manager.get_quota_manager().get_quota_status()["daily_used"] == 301
+
+def test_back_to_back_searches_are_not_rate_limited(client):
+    # Outgoing calls are paced by waiting; back-to-back user searches still succeed
+    for region in ("US", "GB"):
+        response = client.post("/api/search", json={**SEARCH_PAYLOAD, "regions": [region]})
+        assert response.status_code == 200
+
+def test_search_cache_respects_keyword_order(client):
+    first = client.post("/api/search", json={**SEARCH_PAYLOAD, "keywords": ["business podcast", "saas podcast"]})
+    second = client.post("/api/search", json={**SEARCH_PAYLOAD, "keywords": ["saas podcast", "business podcast"]})
+    assert first.json()["data"][0]["keywords_matched"] == ["business podcast"]
+    assert second.json()["data"][0]["keywords_matched"] == ["saas podcast"]
+
+def test_search_rotates_keys_and_skips_exhausted_ones(client, monkeypatch, tmp_path):
+    manager = quota_manager.QuotaManager(str(tmp_path / "keys.json"), api_keys=["key-a", "key-b"])
+    monkeypatch.setattr(quota_manager, "_quota_manager", manager)
+    response = client.post("/api/search", json={**SEARCH_PAYLOAD, "regions": ["US", "GB"]})
+    assert response.status_code == 200
+    assert set(seen_keys) == {"key-a", "key-b"}
+    
+    # Once a key's quota is spent every call goes to the other key
+    main.search_cache.clear()
+    seen_keys.clear()
+    manager.key_usages["key-a"].tokens = 0
+    response = client.post("/api/search", json={**SEARCH_PAYLOAD, "regions": ["US", "GB"]})
+    assert response.status_code == 200
+    assert set(seen_keys) == {"key-b"}
+    
+    # With every key spent the search is rejected before any call goes out
+    main.search_cache.clear()
+    seen_keys.clear()
+    manager.key_usages["key-b"].tokens = 0
+    response = client.post("/api/search", json=SEARCH_PAYLOAD)
+    assert response.status_code == 429
+    assert seen_keys == []
+
+def test_search_serializes_rows_without_revalidating(client, monkeypatch):
+    def fail(*args, **kwargs):
+        raise AssertionError("Channel should not be built for /api/search")
+    monkeypatch.setattr(main.Channel, "__init__", fail)
+    response = client.post("/api/search", json=SEARCH_PAYLOAD)
+    assert response.status_code == 200
+    assert set(response.json()["data"][0]) == set(main.Channel.__fields__)
+
+def test_partial_search_is_not_cached(client):
+    payload = {**SEARCH_PAYLOAD, "regions": ["US", "GB", "CA"]}
+    manager = quota_manager.get_quota_manager()
+    # Enough quota for two region searches and the channels batch, not the third region
+    manager.usage.tokens = 250
+    response = client.post("/api/search", json=payload)
+    assert response.status_code == 200
+    
+    manager.reset()
+    seen_keys.clear()
+    response = client.post("/api/search", json=payload)
+    assert response.status_code == 200
+    # The failed region is fetched again; the calls that succeeded come from the per-call cache
+    assert len(seen_keys) == 1
+    assert client.post("/api/search", json=payload).status_code == 200
+    assert len(seen_keys) == 1  # The now-complete result is cached
+
+def test_window_retry_after_is_enough_to_be_admitted(tmp_path):
+    manager = quota_manager.QuotaManager(str(tmp_path / "window.json"))
+    usage = manager.usage
+    now = time.time()
+    # A full current window and no previous usage: the previous share can't decay before the roll
+    usage.window_start = now - 40000
+    usage.prev_used = 0
+    usage.curr_used = usage.daily_quota
+    allowed, _, retry_after = manager.can_make_request(100)
+    assert not allowed
+    
+    # Checking again once that much time has passed must admit the call
+    usage.tokens = usage.capacity
+    usage.last_request_time = 0
+    with manager._lock:
+        mono = time.monotonic()
+        allowed, _, wait = manager._check_request(usage, 100, now + retry_after + 1, mono)
+    assert allowed, wait
+
+def test_legacy_daily_used_is_carried_over(tmp_path):
+    path = tmp_path / "legacy.json"
+    today = quota_manager.QuotaManager(str(tmp_path / "today.json")).usage.last_reset_date
+    path.write_text(json.dumps({"daily_quota": 10000, "daily_used": 9000, "last_reset_date": today}))
+    manager = quota_manager.QuotaManager(str(path))
+    status = manager.get_quota_status()
+    assert status["daily_used"] == 9000
+    assert status["remaining"] <= 1000